@@ -1,13 +1,70 @@
+import math
 import time
 import fastplotlib as fpl
 import cupy as cp
+import numpy as np
 from fastplotlib.ui import EdgeWindow
 from imgui_bundle import imgui
-from typing import Callable, Dict
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import numba
+except ImportError:  # Only needed for the CPU path used at small point counts
+    numba = None
+
+# Pool device and pinned host allocations, so rebuilds and per-frame temporaries reuse
+# freed blocks instead of going through cudaMalloc / cudaHostAlloc each time
+_device_pool = cp.cuda.MemoryPool()
+_pinned_pool = cp.cuda.PinnedMemoryPool()
+cp.cuda.set_allocator(_device_pool.malloc)
+cp.cuda.set_pinned_memory_allocator(_pinned_pool.malloc)
 
 
 # Waveforms. Their formula, their offset, and their colour
-WaveFunc = Callable[[cp.ndarray, float, float], cp.ndarray]
+# Each formula is a single kernel: y = a * shape(f * (t + p)) + o
+WaveFunc = Callable[[cp.ndarray, float, float, float, float], cp.ndarray]
+
+
+# Sine and Square use fast-math __sinf. u is wrapped to [-0.5, 0.5] first,
+# since __sinf loses accuracy away from [-π, π]
+_sine = cp.ElementwiseKernel(
+    "float32 t, float32 p, float32 f, float32 a, float32 o",
+    "float32 y",
+    "float u = f * (t + p); u -= rintf(u); y = a * __sinf(6.2831853f * u) + o;",
+    "sine_fast",
+    options=("--use_fast_math",),
+)
+
+_square = cp.ElementwiseKernel(
+    "float32 t, float32 p, float32 f, float32 a, float32 o",
+    "float32 y",
+    "float u = f * (t + p); u -= rintf(u); float s = __sinf(6.2831853f * u);"
+    "y = a * (float)((s > 0.0f) - (s < 0.0f)) + o;",
+    "square_fast",
+    options=("--use_fast_math",),
+)
+
+
+# float32 constants, so the fused kernels never promote to float64
+_F32_QUARTER = np.float32(0.25)
+_F32_HALF = np.float32(0.5)
+_F32_ONE = np.float32(1.0)
+_F32_TWO = np.float32(2.0)
+_F32_FOUR = np.float32(4.0)
+
+
+# Branchless fold, equal to 2 * arcsin(sin(2πu)) / π without the transcendentals
+@cp.fuse(kernel_name="triangle")
+def _triangle(t, p, f, a, o):
+    u = f * (t + p) + _F32_QUARTER
+    return a * (_F32_FOUR * cp.abs(u - cp.floor(u + _F32_HALF)) - _F32_ONE) + o
+
+
+@cp.fuse(kernel_name="sawtooth")
+def _sawtooth(t, p, f, a, o):
+    u = f * (t + p)
+    return a * _F32_TWO * (u - cp.floor(_F32_HALF + u)) + o
+
 
 defaults = {
     "freq": 5.0,
@@ -18,7 +75,8 @@ defaults = {
 
 WAVEFORMS: Dict[str, dict] = {
     "Sine": {
-        "func": lambda t, f, a: a * cp.sin(2 * cp.pi * f * t),
+        "func": _sine,
+        "kind": 0,
         "offset": 0.0,
         "color": "blue",
         "enabled": True,
@@ -27,7 +85,8 @@ WAVEFORMS: Dict[str, dict] = {
         "speed_hz": defaults["speed_hz"],
     },
     "Square": {
-        "func": lambda t, f, a: a * cp.sign(cp.sin(2 * cp.pi * f * t)),
+        "func": _square,
+        "kind": 1,
         "offset": 20.0,
         "color": "red",
         "enabled": True,
@@ -36,7 +95,8 @@ WAVEFORMS: Dict[str, dict] = {
         "speed_hz": defaults["speed_hz"],
     },
     "Triangle": {
-        "func": lambda t, f, a: a * 2 * cp.arcsin(cp.sin(2 * cp.pi * f * t)) / cp.pi,
+        "func": _triangle,
+        "kind": 2,
         "offset": 40.0,
         "color": "green",
         "enabled": True,
@@ -45,7 +105,8 @@ WAVEFORMS: Dict[str, dict] = {
         "speed_hz": defaults["speed_hz"],
     },
     "Sawtooth": {
-        "func": lambda t, f, a: a * 2 * (t * f - cp.floor(0.5 + t * f)),
+        "func": _sawtooth,
+        "kind": 3,
         "offset": 60.0,
         "color": "orange",
         "enabled": True,
@@ -55,6 +116,106 @@ WAVEFORMS: Dict[str, dict] = {
     },
 }
 
+# Kind code for a waveform that the batched kernel should skip
+_KIND_OFF = -1
+
+# Kinds that read the cached sin/cos tables (Sine, Square)
+_TABLE_KINDS = (0, 1)
+
+# Evaluates every waveform in one launch. Each thread owns one point and
+# writes out[w * N + i] for every wave w whose kind isn't _KIND_OFF.
+# Maths is float32, a * shape is stored as float16 to halve the D→H copy.
+# The offset is added on the host during the float32 upcast, so float16 spacing
+# follows the amplitude rather than how far the line is offset.
+# Sine and Square rotate the cached sin/cos(2πft) tables by the phase,
+# sin(2πf(t + p)) = sin(2πft)cos(2πfp) + cos(2πft)sin(2πfp), so no
+# transcendentals are evaluated per point for them
+_wave_kernel = cp.RawKernel(
+    r"""
+#include <cuda_fp16.h>
+
+extern "C" __global__
+void eval_waves(const float* t, const float* sin_ft, const float* cos_ft,
+                const float* phase, const float* cos_p, const float* sin_p,
+                const float* freq, const float* amp,
+                const int* kind, __half* out, int N, int W)
+{
+    int i = blockIdx.x * blockDim.x + threadIdx.x;
+    if (i >= N) return;
+
+    float ti = t[i];
+    for (int w = 0; w < W; ++w) {
+        int k = kind[w];
+        if (k < 0) continue;
+
+        int j = w * N + i;
+        float y;
+        if (k == 2) {  // Triangle, branchless fold of 2/π * asin(sin(2πu))
+            float u = fmaf(freq[w], ti + phase[w], 0.25f);
+            y = fmaf(4.0f, fabsf(u - floorf(u + 0.5f)), -1.0f);
+        } else if (k == 3) {  // Sawtooth
+            float u = freq[w] * (ti + phase[w]);
+            y = 2.0f * (u - floorf(0.5f + u));
+        } else {
+            float s = fmaf(sin_ft[j], cos_p[w], cos_ft[j] * sin_p[w]);
+            if (k == 0) {  // Sine
+                y = s;
+            } else {  // Square
+                y = (float)((s > 0.0f) - (s < 0.0f));
+            }
+        }
+        out[j] = __float2half(amp[w] * y);
+    }
+}
+""",
+    "eval_waves",
+    options=("--use_fast_math",),
+)
+_BLOCK_SIZE = 256
+
+# Below this many points, kernel launch and copy latency outweighs the maths,
+# so waveforms are evaluated on the CPU with Numba instead (if it is installed)
+_CPU_MAX_POINTS = 2048
+
+if numba is not None:
+
+    # CPU twin of eval_waves, writing float32 y straight into out
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _eval_waves_cpu(t, params, kinds, out):
+        for i in numba.prange(t.size):
+            ti = t[i]
+            for w in range(kinds.size):
+                k = kinds[w]
+                if k < 0:
+                    continue
+
+                u = params[3, w] * (ti + params[0, w])
+                if k == 2:  # Triangle
+                    u += 0.25
+                    y = 4.0 * abs(u - math.floor(u + 0.5)) - 1.0
+                elif k == 3:  # Sawtooth
+                    y = 2.0 * (u - math.floor(0.5 + u))
+                else:
+                    s = math.sin(2.0 * math.pi * u)
+                    if k == 0:  # Sine
+                        y = s
+                    elif s > 0.0:  # Square
+                        y = 1.0
+                    elif s < 0.0:
+                        y = -1.0
+                    else:
+                        y = 0.0
+                out[w, i] = params[4, w] * y + params[5, w]
+
+    # Compile once at import with the real dtypes, not inside the first small-N render callback
+    _eval_waves_cpu(
+        np.zeros(2, dtype=np.float32),
+        np.zeros((6, len(WAVEFORMS)), dtype=np.float32),
+        np.full(len(WAVEFORMS), _KIND_OFF, dtype=np.int32),
+        np.empty((len(WAVEFORMS), 2), dtype=np.float32),
+    )
+
+
 waveform_defaults = {
     name: {
         "freq": wf["freq"],
@@ -65,17 +226,50 @@ waveform_defaults = {
     for name, wf in WAVEFORMS.items()
 }
 
-# Create evenly spaced points between 0 and 1, as a float32 CuPy array
-t = cp.linspace(0, 1, defaults["n_points"], dtype=cp.float32)
+# Evenly spaced points between 0 and 1, as a float32 CuPy array. Built by _upload_t
+t: cp.ndarray = None
 
-# Per-waveform phase offsets
-_phases: Dict[str, float] = {name: 0.0 for name in WAVEFORMS.keys()}
+# Stable integer ID per waveform, its row or column in every per-waveform buffer
+_wave_idx: Dict[str, int] = {name: i for i, name in enumerate(WAVEFORMS)}
+
+# Flat per-waveform parameters indexed by _wave_idx, kept in sync with WAVEFORMS by _store_params.
+# _params is laid out as the kernel reads it: phase, cos(2πfp), sin(2πfp), freq, amplitude, offset
+_params = np.zeros((6, len(WAVEFORMS)), dtype=np.float32)
+_freqs, _amps, _offsets = _params[3], _params[4], _params[5]
+_speeds = np.zeros(len(WAVEFORMS))
+_enabled = np.zeros(len(WAVEFORMS), dtype=bool)
+_kinds = np.array([wf["kind"] for wf in WAVEFORMS.values()], dtype=np.int32)
+_uses_tables = np.isin(_kinds, _TABLE_KINDS)
+
+# Per-waveform phase offsets, float64 so the accumulated phase doesn't drift
+_phases_arr = np.zeros(len(WAVEFORMS))
+
+
+_F16_MAX = float(np.finfo(np.float16).max)
+
+
+# Copy a waveform's UI-facing settings into the flat parameter arrays
+def _store_params(name: str):
+    i = _wave_idx[name]
+    wf = WAVEFORMS[name]
+    _freqs[i] = wf["freq"]
+    # Keep a * shape inside float16 range, larger values would become inf
+    _amps[i] = np.clip(wf["amplitude"], -_F16_MAX, _F16_MAX)
+    _offsets[i] = wf["offset"]
+    _speeds[i] = wf["speed_hz"]
+    _enabled[i] = wf["enabled"]
+
+
+for _name in WAVEFORMS:
+    _store_params(_name)
 
 # Guard to avoid updating while rebuilding graphics
 _is_rebuilding = False
 
 _current_n_points = defaults["n_points"]
 _last_time = None  # monotonic timestamp for dt
+_target_dt = 1.0 / 60.0  # don't recompute faster than a 60 Hz display refreshes
+_next_due = None  # monotonic deadline for the next computed frame, advanced by _target_dt
 
 
 # Delete all existing lines from subplot
@@ -88,10 +282,16 @@ def delete_all_lines(subplot, lines_dict):
     lines_dict.clear()
 
 
-# Generate waveforms + their y offsets
-def create_waveforms(phases: Dict[str, float]):
+# Generate waveforms + their y offsets. Scalars are passed as float32 to match t
+def create_waveforms(phases: np.ndarray):
     return {
-        name: wf["func"](t + phases.get(name, 0.0), wf["freq"], wf["amplitude"]) + wf["offset"]
+        name: wf["func"](
+            t,
+            np.float32(phases[_wave_idx[name]]),
+            np.float32(wf["freq"]),
+            np.float32(wf["amplitude"]),
+            np.float32(wf["offset"]),
+        )
         for name, wf in WAVEFORMS.items()
     }
 
@@ -104,28 +304,158 @@ subplot.title = "Waveform Animation"
 subplot.axes.visible = False  # hide axes
 
 
-# Persistent contiguous Y buffers for fast updates
-_line_y_buffers: Dict[str, cp.ndarray] = {}
+# Two streams used on alternate frames, so one frame's D→H copy overlaps the next frame's compute
+_streams = (cp.cuda.Stream(non_blocking=True), cp.cuda.Stream(non_blocking=True))
+
+# Stream for the rebuild transfers and kernels, so they don't touch the blocking default stream
+_rebuild_stream = cp.cuda.Stream(non_blocking=True)
+
+# Device copies of the launch parameters, one set per stream, reused every frame
+_params_gpu = tuple(cp.empty(_params.shape, dtype=cp.float32) for _ in _streams)
+_kinds_gpu = tuple(cp.empty(len(WAVEFORMS), dtype=cp.int32) for _ in _streams)
+
+# Persistent page-locked float16 (n_waveforms, n_points) mirrors of _y_out, without the offset, one per stream,
+# so a whole frame comes back in one copy. Screen-space plotting doesn't need more precision
+_y_host: Tuple[np.ndarray, np.ndarray] = ()
+
+# float32 row the float16 GPU rows are upcast and offset into before being written to a line
+_y_row_f32: np.ndarray = None
+
+# Host copy of the x column. x never changes between rebuilds, so only y is transferred
+_x_host: np.ndarray = None
+
+# x columns of recently used point counts, in pinned memory since t is uploaded from them
+_x_host_cache: Dict[int, np.ndarray] = {}
+_X_HOST_CACHE_MAX = 8
+
+# (n_waveforms, n_points) float16 outputs of the batched kernel, one row per waveform, one per stream
+_y_out: Tuple[cp.ndarray, cp.ndarray] = ()
+
+# Cached sin(2πft) and cos(2πft), one row per waveform.
+# A row is only refreshed when the waveform's frequency differs from _table_freqs
+_sin_table: cp.ndarray = None
+_cos_table: cp.ndarray = None
+_table_freqs = np.full(len(WAVEFORMS), np.nan, dtype=np.float32)
+
+# Slot and event recorded after a table refresh. The other stream waits on it before
+# its next launch, so it can't read rows that are still being rewritten
+_tables_written: Optional[Tuple[int, cp.cuda.Event]] = None
+
+# Launch parameters each waveform was last evaluated with. A waveform whose column of _params
+# still matches (e.g. speed 0 and untouched settings) already shows the right y and is skipped
+_last_sig = np.full(_params.shape, np.nan, dtype=np.float32)
+
+# Whether the current point count is evaluated on the CPU, and its (n_waveforms, n_points) output
+_use_cpu = False
+_y_cpu: np.ndarray = None
+
+# Frame counter, picks the stream and buffers for the current frame
+_frame = 0
+
+# Buffer slot, waveform indices and offsets of the frame whose copy is still in flight
+_in_flight: Optional[Tuple[int, np.ndarray, np.ndarray]] = None
 
 # Dict of all existing lines
 lines = {}
 
-
-# Create xy positions from x and y cupy arrays, return as numpy array
-def _positions_xy_numpy(x_cp: cp.ndarray, y_cp: cp.ndarray):
-    return cp.stack([x_cp, y_cp], axis=1).get()
+# Per-waveform (name, line, pinned host y rows), indexed by _wave_idx.
+# Rebuilt with the lines so update() does no dict lookups
+_render_plan: Tuple[tuple, ...] = ()
+
+
+# Allocate a page-locked NumPy array so GPU → CPU copies can DMA straight into it
+def _pinned_empty(shape, dtype=np.float32) -> np.ndarray:
+    count = int(np.prod(shape))
+    mem = cp.cuda.alloc_pinned_memory(count * np.dtype(dtype).itemsize)
+    return np.frombuffer(mem, dtype=dtype, count=count).reshape(shape)
+
+
+# Host x column for n points, from the cache if this point count was used before
+def _x_column_host(n: int) -> np.ndarray:
+    x_host = _x_host_cache.get(n)
+    if x_host is None:
+        x_host = _pinned_empty(n)
+        x_host[:] = np.linspace(0, 1, n, dtype=np.float32)
+        if len(_x_host_cache) >= _X_HOST_CACHE_MAX:
+            del _x_host_cache[next(iter(_x_host_cache))]
+        _x_host_cache[n] = x_host
+    return x_host
+
+
+# Build t on the host and upload it asynchronously on the rebuild stream,
+# rather than running cp.linspace on the blocking default stream
+def _upload_t(n: int) -> cp.ndarray:
+    t_new = cp.empty(n, dtype=cp.float32)
+    t_new.set(_x_column_host(n), stream=_rebuild_stream)
+    return t_new
+
+
+# Fill the y column of a preallocated (N, 2) xy buffer from a cupy y array, return the buffer.
+# The strided column can't be a .get() target, so y lands in the flat y_scratch first
+def _positions_xy_numpy(xy_host: np.ndarray, y_scratch: np.ndarray, y_cp: cp.ndarray):
+    y_cp.get(out=y_scratch)
+    xy_host[:, 1] = y_scratch
+    return xy_host
+
+
+# Fills both tables in one pass with the fast-math __sincosf intrinsic
+_sincos_ft = cp.ElementwiseKernel(
+    "float32 t, float32 f",
+    "float32 s, float32 c",
+    "float u = f * t; u -= rintf(u); float sv, cv; __sincosf(6.2831853f * u, &sv, &cv); s = sv; c = cv;",
+    "sincos_ft",
+    options=("--use_fast_math",),
+)
+
+
+# Recompute the cached sin/cos(2πft) rows of waveform w for its current frequency
+def _refresh_ft_tables(w: int):
+    _sincos_ft(t, _freqs[w], _sin_table[w], _cos_table[w])
+    _table_freqs[w] = _freqs[w]
+
+
+# Evaluate all waveforms into the rows of out with a single kernel launch.
+# p rows are phase, cos(2πfp), sin(2πfp), freq, amplitude and offset, one column per waveform.
+# The offset row isn't read, the GPU rows are offset in _present_in_flight
+def _eval_waves(p: cp.ndarray, k: cp.ndarray, out: cp.ndarray):
+    n_waves, n = out.shape
+    grid = ((n + _BLOCK_SIZE - 1) // _BLOCK_SIZE,)
+    _wave_kernel(
+        grid,
+        (_BLOCK_SIZE,),
+        (
+            t, _sin_table, _cos_table,
+            p[0], p[1], p[2], p[3], p[4],
+            k, out, np.int32(n), np.int32(n_waves),
+        ),
+    )
 
 
 # Creates lines, or recreates them if they already exist
 def _create_or_recreate_lines():
-    global lines
-    waves_local = create_waveforms(_phases)
+    global lines, _y_out, _y_host, _y_row_f32, _x_host, _frame, _in_flight, _sin_table, _cos_table, _render_plan
+    global _use_cpu, _y_cpu, _tables_written
+    waves_local = create_waveforms(_phases_arr)
+    _x_host = _x_column_host(t.size)
+    _use_cpu = numba is not None and t.size < _CPU_MAX_POINTS
+    _y_cpu = np.empty((len(WAVEFORMS), t.size), dtype=np.float32) if _use_cpu else None
+
+    # Let in-flight copies land before their buffers are released
+    for stream in _streams:
+        stream.synchronize()
+    _frame = 0
+    _in_flight = None
+    _tables_written = None
 
     delete_all_lines(subplot, lines)
-    _line_y_buffers.clear()
+
+    # add_line copies its data, so one pinned xy buffer with x filled once serves every line
+    xy_host = _pinned_empty((t.size, 2))
+    xy_host[:, 0] = _x_host
+    y_scratch = _pinned_empty(t.size)
 
     for name, y in waves_local.items():
-        data = _positions_xy_numpy(t, y)
+        data = _positions_xy_numpy(xy_host, y_scratch, y)
         line = subplot.add_line(
             data=data,
             name=name,
@@ -135,7 +465,20 @@ def _create_or_recreate_lines():
         line.visible = WAVEFORMS[name]["enabled"]
 
         lines[name] = line
-        _line_y_buffers[name] = line.data[:, 1].copy()
+
+    _y_out = tuple(cp.empty((len(WAVEFORMS), t.size), dtype=cp.float16) for _ in _streams)
+    _y_host = tuple(_pinned_empty((len(WAVEFORMS), t.size), np.float16) for _ in _streams)
+    _y_row_f32 = np.empty(t.size, dtype=np.float32)
+    _render_plan = tuple(
+        (name, lines[name], tuple(host[w] for host in _y_host))
+        for w, name in enumerate(WAVEFORMS)
+    )
+
+    # New t, so every table is stale. update() refills them on the next frame
+    _sin_table = cp.empty((len(WAVEFORMS), t.size), dtype=cp.float32)
+    _cos_table = cp.empty_like(_sin_table)
+    _table_freqs[:] = np.nan
+    _last_sig[:] = np.nan
 
 
 # Rebuild lines with a different number of points
@@ -151,18 +494,49 @@ def _rebuild_with_points(new_n_points: int):
     _is_rebuilding = True
     try:
         _current_n_points = new_n_points
-        t = cp.linspace(0, 1, new_n_points, dtype=cp.float32)
-        _create_or_recreate_lines()
+        with _rebuild_stream:
+            t = _upload_t(new_n_points)
+            _create_or_recreate_lines()
     finally:
         _is_rebuilding = False
 
 
-_create_or_recreate_lines()
+with _rebuild_stream:
+    t = _upload_t(_current_n_points)
+    _create_or_recreate_lines()
+
+
+# Write a host y column into waveform w's line
+def _set_line_y(w: int, y: np.ndarray):
+    name, line, _ = _render_plan[w]
+    try:
+        line.data[:, 1] = y
+    except Exception as e:
+        print(f"Line update failed ({name}): {e}")
+
+
+# Present the frame whose copy is in flight, if any, once its stream has finished.
+# With wait=False a frame that isn't finished yet is left for a later callback
+def _present_in_flight(wait: bool = True):
+    global _in_flight
+
+    if _in_flight is None:
+        return
+    prev_slot, prev_submitted, prev_offsets = _in_flight
+    if not wait and not _streams[prev_slot].done:
+        return
+    _in_flight = None
+    _streams[prev_slot].synchronize()
+
+    for w in prev_submitted:
+        # Upcast the float16 row and add its offset in place, without a per-frame allocation
+        np.add(_render_plan[w][2][prev_slot], prev_offsets[w], out=_y_row_f32, dtype=np.float32)
+        _set_line_y(w, _y_row_f32)
 
 
 # Update animation
 def update(_subplot):
-    global _last_time
+    global _last_time, _next_due, _frame, _in_flight, _tables_written
 
     if _is_rebuilding:
         return
@@ -170,27 +544,68 @@ def update(_subplot):
     now = time.monotonic()
     if _last_time is None:
         _last_time = now
+        _next_due = now
         return
+    if now < _next_due:
+        # No new frame yet, but don't hold back one that is already computed
+        _present_in_flight(wait=False)
+        return
+    # Step the deadline by whole frames so callbacks at any refresh rate average out near 60 Hz,
+    # but never let it fall more than a frame behind after a stall
+    _next_due = max(_next_due + _target_dt, now - _target_dt)
     dt = now - _last_time
     _last_time = now
 
-    for name, line in list(lines.items()):
-        wf = WAVEFORMS.get(name)
-
-        if not wf["enabled"]:
-            continue
-
-        # Advance phase by speed (Hz) * elapsed seconds
-        _phases[name] += dt * wf["speed_hz"]
-
-        y_shifted = wf["func"](t + _phases[name], wf["freq"], wf["amplitude"]) + wf["offset"]
+    # Advance phase by speed (Hz) * elapsed seconds
+    np.add(_phases_arr, dt * _speeds, out=_phases_arr, where=_enabled)
+
+    theta_p = 2 * np.pi * _phases_arr * _freqs
+    _params[0] = _phases_arr
+    np.cos(theta_p, out=_params[1])
+    np.sin(theta_p, out=_params[2])
+    active = _enabled & (_params != _last_sig).any(axis=0)
+    submitted = np.flatnonzero(active)
+    kinds = np.where(active, _kinds, np.int32(_KIND_OFF))
+    launched = None
+
+    if _use_cpu:
+        if submitted.size:
+            _eval_waves_cpu(_x_host, _params, kinds, _y_cpu)
+            _last_sig[:, submitted] = _params[:, submitted]
+            for w in submitted:
+                _set_line_y(w, _y_cpu[w])
+        return
 
-        try:
-            y_buf = _line_y_buffers[name]
-            y_shifted.get(out=y_buf)  # contiguous GPU → CPU copy
-            line.data[:, 1] = y_buf  # fast NumPy memcpy
-        except Exception as e:
-            print(f"Line update failed ({name}): {e}")
+    if submitted.size:
+        slot = _frame & 1
+        stream = _streams[slot]
+        stale = np.flatnonzero(active & _uses_tables & (_freqs != _table_freqs))
+
+        with stream:
+            if _tables_written is not None and _tables_written[0] != slot:
+                # The other stream may still be writing table rows this launch reads
+                stream.wait_event(_tables_written[1])
+                _tables_written = None
+            if stale.size:
+                # The previous frame's kernel may still be reading the tables on the other stream
+                stream.wait_event(_streams[1 - slot].record())
+                for w in stale:
+                    _refresh_ft_tables(w)
+                _tables_written = (slot, stream.record())
+            _params_gpu[slot].set(_params, stream=stream)
+            _kinds_gpu[slot].set(kinds, stream=stream)
+            _eval_waves(_params_gpu[slot], _kinds_gpu[slot], _y_out[slot])
+
+            # One contiguous GPU → pinned CPU copy spanning every evaluated row
+            rows = slice(submitted[0], submitted[-1] + 1)
+            _y_out[slot][rows].get(stream=stream, out=_y_host[slot][rows], blocking=False)
+        _last_sig[:, submitted] = _params[:, submitted]
+        launched = (slot, submitted, _offsets.copy())
+        _frame += 1
+
+    # Present the previous frame, its copy ran while this frame was being queued
+    _present_in_flight()
+    _in_flight = launched
 
 
 # Add animation to subplot
@@ -205,7 +620,7 @@ class WaveformUI(EdgeWindow):
         self._pending_points = None
 
     def update(self):
-        global _phases, _last_time
+        global _last_time
 
         imgui.separator()
         imgui.text("Waveforms")
@@ -213,86 +628,89 @@ class WaveformUI(EdgeWindow):
         if imgui.begin_tab_bar("WaveformTabs"):
             for name, wf in WAVEFORMS.items():
                 opened, _ = imgui.begin_tab_item(name)
-                if opened:
-                    changed, enabled = imgui.checkbox(f"Enabled##{name}", wf["enabled"])
-                    if changed:
-                        wf["enabled"] = enabled
-                        lines[name].visible = enabled
-
-                    # Amplitude
-                    changed_slider, new_amp = imgui.slider_float(
-                        f"Amplitude##{name}", float(wf["amplitude"]), 0.0, 10.0
-                    )
-                    changed_text, text_amp = imgui.input_float(
-                        f"##AmplitudeInput{name}", float(wf["amplitude"]), step=0.5, format="%.2f"
-                    )
-                    if changed_slider:
-                        wf["amplitude"] = float(new_amp)
-                    if changed_text:
-                        wf["amplitude"] = float(text_amp)
-
-                    # Frequency
-                    changed_slider_f, new_freq = imgui.slider_float(
-                        f"Frequency##{name}", float(wf["freq"]), 1.0, 100.0
-                    )
-                    changed_text_f, text_freq = imgui.input_float(
-                        f"##FrequencyInput{name}", float(wf["freq"]), step=5.0, format="%.2f"
-                    )
-                    if changed_slider_f:
-                        wf["freq"] = float(new_freq)
-                    if changed_text_f:
-                        wf["freq"] = float(text_freq)
-
-                    # Offset
-                    changed_offset, new_offset = imgui.slider_float(
-                        f"Offset##{name}", float(wf["offset"]), -100.0, 100.0
-                    )
-                    changed_offset_text, text_offset = imgui.input_float(
-                        f"##OffsetInput{name}", float(wf["offset"]), step=5, format="%.2f"
-                    )
-                    if changed_offset:
-                        wf["offset"] = float(new_offset)
-                    if changed_offset_text:
-                        wf["offset"] = float(text_offset)
-
-                    # Speed (Hz)
-                    changed_speed, new_speed = imgui.slider_float(
-                        f"Speed (Hz)##{name}", float(wf["speed_hz"]), -2.0, 2.0
-                    )
-                    changed_speed_text, text_speed = imgui.input_float(
-                        f"##SpeedInput{name}", float(wf["speed_hz"]), step=0.5, format="%.2f"
-                    )
-                    if changed_speed:
-                        wf["speed_hz"] = float(new_speed)
-                    if changed_speed_text:
-                        wf["speed_hz"] = float(text_speed)
-
-                    # Per-waveform reset
-                    if imgui.button(f"Reset {name}"):
-                        wf["freq"] = waveform_defaults[name]["freq"]
-                        wf["amplitude"] = waveform_defaults[name]["amplitude"]
-                        wf["offset"] = waveform_defaults[name]["offset"]
-                        wf["speed_hz"] = waveform_defaults[name]["speed_hz"]
-                        wf["enabled"] = True
-                        lines[name].visible = True
-                        _phases[name] = 0.0
-                        _last_time = None  # resync timing after reset
-
-                    imgui.end_tab_item()
+                if not opened:
+                    continue
+
+                # Read each setting once. The slider and its input box share the local,
+                # and WAVEFORMS is only written when a control actually changed it
+                amp = wf["amplitude"]
+                freq = wf["freq"]
+                offset = wf["offset"]
+                speed = wf["speed_hz"]
+
+                changed, enabled = imgui.checkbox(f"Enabled##{name}", wf["enabled"])
+                if changed:
+                    wf["enabled"] = enabled
+                    lines[name].visible = enabled
+
+                # Amplitude
+                changed_slider, amp = imgui.slider_float(f"Amplitude##{name}", amp, 0.0, 10.0)
+                changed_text, amp = imgui.input_float(
+                    f"##AmplitudeInput{name}", amp, step=0.5, format="%.2f"
+                )
+                if changed_slider or changed_text:
+                    wf["amplitude"] = amp
+                    changed = True
+
+                # Frequency
+                changed_slider_f, freq = imgui.slider_float(f"Frequency##{name}", freq, 1.0, 100.0)
+                changed_text_f, freq = imgui.input_float(
+                    f"##FrequencyInput{name}", freq, step=5.0, format="%.2f"
+                )
+                if changed_slider_f or changed_text_f:
+                    wf["freq"] = freq
+                    changed = True
+
+                # Offset
+                changed_offset, offset = imgui.slider_float(f"Offset##{name}", offset, -100.0, 100.0)
+                changed_offset_text, offset = imgui.input_float(
+                    f"##OffsetInput{name}", offset, step=5, format="%.2f"
+                )
+                if changed_offset or changed_offset_text:
+                    wf["offset"] = offset
+                    changed = True
+
+                # Speed (Hz)
+                changed_speed, speed = imgui.slider_float(f"Speed (Hz)##{name}", speed, -2.0, 2.0)
+                changed_speed_text, speed = imgui.input_float(
+                    f"##SpeedInput{name}", speed, step=0.5, format="%.2f"
+                )
+                if changed_speed or changed_speed_text:
+                    wf["speed_hz"] = speed
+                    changed = True
+
+                # Per-waveform reset
+                if imgui.button(f"Reset {name}"):
+                    wf["freq"] = waveform_defaults[name]["freq"]
+                    wf["amplitude"] = waveform_defaults[name]["amplitude"]
+                    wf["offset"] = waveform_defaults[name]["offset"]
+                    wf["speed_hz"] = waveform_defaults[name]["speed_hz"]
+                    wf["enabled"] = True
+                    lines[name].visible = True
+                    _phases_arr[_wave_idx[name]] = 0.0
+                    _last_time = None  # resync timing after reset
+                    changed = True
+
+                if changed:
+                    _store_params(name)
+                imgui.end_tab_item()
             imgui.end_tab_bar()
 
         imgui.separator()
         imgui.text("Global")
 
-        # Points
+        # Points. Only rebuild once the slider, text box or held step button is released,
+        # rather than on every value it passes through
         changed_p_slider, new_points = imgui.slider_int("Points", int(self._points), 128, 200_000)
-        changed_p_text, text_points = imgui.input_int("##Points", int(self._points), step=256)
-
         if changed_p_slider:
             self._points = int(new_points)
+        if imgui.is_item_deactivated_after_edit():
             self._pending_points = self._points
+
+        changed_p_text, text_points = imgui.input_int("##Points", int(self._points), step=256)
         if changed_p_text:
             self._points = int(text_points)
+        if imgui.is_item_deactivated_after_edit():
             self._pending_points = self._points
 
         if self._pending_points is not None and self._pending_points != _current_n_points:
@@ -309,7 +727,8 @@ class WaveformUI(EdgeWindow):
                 wf["speed_hz"] = waveform_defaults[name]["speed_hz"]
                 wf["enabled"] = True
                 lines[name].visible = True
-                _phases[name] = 0.0
+                _phases_arr[_wave_idx[name]] = 0.0
+                _store_params(name)
             _last_time = None  # resync timing
             _rebuild_with_points(self._points)
 